@@ -8,18 +8,54 @@ self-contained.
 
 Usage:
     python3 bundle_dependencies.py
+
+    # Rebuild even if requirements.txt has not changed:
+    python3 bundle_dependencies.py --force
     
     # Or with Anki's Python (recommended for compatibility):
     /Applications/Anki.app/Contents/MacOS/AnkiPython bundle_dependencies.py
 """
+import hashlib
 import os
+import re
 import sys
 import subprocess
 import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
 VENDOR_DIR = os.path.join(ADDON_DIR, 'vendor')
 REQUIREMENTS_FILE = os.path.join(ADDON_DIR, 'requirements.txt')
+REQUIREMENTS_HASH_FILE = os.path.join(VENDOR_DIR, '.req_hash')
+MAX_PARALLEL_DOWNLOADS = 5
+
+# pip only treats '#' as a comment at the start of a line or after whitespace,
+# so URL fragments such as '#egg=' are kept
+_COMMENT = re.compile(r'(^|\s)#.*')
+# Per-requirement options, e.g. 'pkg==1.0 --hash=sha256:...'
+_REQUIREMENT_OPTIONS = re.compile(r'\s+--?[A-Za-z]')
+
+def requirements_hash():
+    """Hash requirements.txt together with the interpreter it is bundled for"""
+    digest = hashlib.sha256()
+    with open(REQUIREMENTS_FILE, 'rb') as f:
+        digest.update(f.read())
+    # Compiled wheels differ per Python version and platform
+    digest.update(f"{sys.version_info[:2]} {sys.platform}".encode())
+    return digest.hexdigest()
+
+def vendor_is_current():
+    """Check whether vendor/ was built from the current requirements.txt"""
+    if not os.path.exists(REQUIREMENTS_FILE) or not os.path.exists(REQUIREMENTS_HASH_FILE):
+        return False
+    with open(REQUIREMENTS_HASH_FILE) as f:
+        return f.read().strip() == requirements_hash()
+
+def write_requirements_hash():
+    """Record which requirements.txt the vendor directory was built from"""
+    with open(REQUIREMENTS_HASH_FILE, 'w') as f:
+        f.write(requirements_hash() + '\n')
 
 def clean_vendor_dir():
     """Remove existing vendor directory"""
@@ -38,43 +74,111 @@ def install_dependencies():
     print(f"\nInstalling dependencies from {REQUIREMENTS_FILE}...")
     print(f"Using Python: {sys.executable}\n")
     
-    # Install packages to vendor directory
+    # Install packages to vendor directory. The prefetched downloads are
+    # offered via --find-links; the index stays available for anything they
+    # do not cover (nested -r files, option lines, failed prefetches).
+    # close_fds=False lets CPython start pip via posix_spawn instead of
+    # fork()+exec(); the child simply inherits our (few) open descriptors.
     try:
-        subprocess.check_call([
-            sys.executable, '-m', 'pip', 'install',
-            '--target', VENDOR_DIR,
-            '--upgrade',
-            '-r', REQUIREMENTS_FILE
-        ])
+        with tempfile.TemporaryDirectory() as wheel_dir:
+            find_links = []
+            for download_dir in download_dependencies(wheel_dir):
+                find_links += ['--find-links', download_dir]
+            subprocess.check_call([
+                sys.executable, '-m', 'pip', 'install',
+                *find_links,
+                '--target', VENDOR_DIR,
+                '--upgrade',
+                '-r', REQUIREMENTS_FILE
+            ], close_fds=False)
         print("\n✓ Dependencies installed successfully")
     except subprocess.CalledProcessError as e:
         print(f"\n✗ Error installing dependencies: {e}")
         sys.exit(1)
 
+def read_requirements():
+    """Return the requirement specifiers listed in requirements.txt.
+
+    Option lines (-r, -c, --index-url, ...) and per-requirement options
+    (--hash, ...) are skipped; the final `pip install -r` applies them.
+    """
+    requirements = []
+    with open(REQUIREMENTS_FILE) as f:
+        for line in f:
+            line = _COMMENT.sub('', line).strip()
+            if not line:
+                continue
+            if line.startswith('-'):
+                print(f"Not prefetching option line '{line}'; pip install -r will apply it")
+                continue
+            requirements.append(_REQUIREMENT_OPTIONS.split(line, 1)[0])
+    return requirements
+
+def download_dependencies(wheel_dir):
+    """Prefetch each requirement concurrently, one pip process per requirement.
+
+    Returns the directories that were downloaded. A failed prefetch is only
+    reported; the final install fetches that requirement itself.
+    """
+    requirements = read_requirements()
+
+    def download(index, requirement):
+        # Separate directories so concurrent pips never write the same file
+        dest = os.path.join(wheel_dir, str(index))
+        try:
+            subprocess.check_call([
+                sys.executable, '-m', 'pip', 'download',
+                '--dest', dest,
+                requirement
+            ], close_fds=False)
+        except subprocess.CalledProcessError as e:
+            print(f"Could not prefetch '{requirement}' ({e}); pip install will fetch it")
+            return None
+        return dest
+
+    workers = max(1, min(MAX_PARALLEL_DOWNLOADS, len(requirements)))
+    print(f"Downloading {len(requirements)} requirement(s) with {workers} parallel pip process(es)...")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        dests = executor.map(download, range(len(requirements)), requirements)
+        return [dest for dest in dests if dest is not None]
+
 def cleanup():
     """Remove unnecessary files from vendor directory"""
     print("\nCleaning up vendor directory...")
-    
-    for root, dirs, files in os.walk(VENDOR_DIR):
-        # Remove __pycache__ directories
-        if '__pycache__' in dirs:
-            pycache_path = os.path.join(root, '__pycache__')
-            shutil.rmtree(pycache_path)
-            dirs.remove('__pycache__')
-        
-        # Remove .pyc and .pyo files
-        for file in files:
-            if file.endswith(('.pyc', '.pyo')):
-                os.remove(os.path.join(root, file))
-        
-        # Remove .dist-info and .egg-info directories
-        dirs_to_remove = [d for d in dirs if d.endswith(('.dist-info', '.egg-info'))]
-        for dir_name in dirs_to_remove:
-            shutil.rmtree(os.path.join(root, dir_name))
-            dirs.remove(dir_name)
-    
+    # Top-level packages are disjoint subtrees, so they can be cleaned in parallel
+    packages = _clean_entries(VENDOR_DIR)
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        list(executor.map(_fast_clean, packages))
     print("✓ Cleanup complete")
 
+def _fast_clean(root):
+    """Remove caches and packaging metadata below root.
+
+    os.scandir reports each entry's type straight from readdir, so unlike
+    os.walk this needs no extra stat call per file.
+    """
+    for path in _clean_entries(root):
+        _fast_clean(path)
+
+def _clean_entries(root):
+    """Clean the direct entries of root; return the subdirectories left to visit"""
+    subdirs = []
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry)
+            elif entry.name.endswith(('.pyc', '.pyo')):
+                os.remove(entry.path)
+
+    remaining = []
+    for entry in subdirs:
+        # Remove __pycache__, .dist-info and .egg-info directories wholesale
+        if entry.name == '__pycache__' or entry.name.endswith(('.dist-info', '.egg-info')):
+            shutil.rmtree(entry.path)
+        else:
+            remaining.append(entry.path)
+    return remaining
+
 def create_vendor_readme():
     """Create a README in vendor directory explaining its purpose"""
     readme_content = """# Vendor Directory
@@ -112,10 +216,15 @@ def main():
     print(f"Addon directory: {ADDON_DIR}")
     print(f"Vendor directory: {VENDOR_DIR}")
     
+    if '--force' not in sys.argv[1:] and vendor_is_current():
+        print("\n✓ vendor/ is up to date with requirements.txt (use --force to rebuild)")
+        return
+    
     clean_vendor_dir()
     install_dependencies()
     cleanup()
     create_vendor_readme()
+    write_requirements_hash()
     
     print("\n" + "=" * 60)
     print("✓ Bundling complete!")
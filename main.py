@@ -1,6 +1,14 @@
 import random
 import sys
 import os
+import json
+import re
+import string
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Add vendor directory to Python path for bundled dependencies
 # This allows us to ship libraries with the addon
@@ -12,21 +20,25 @@ if os.path.exists(_vendor_dir):
     if _vendor_dir not in sys.path:
         sys.path.insert(0, _vendor_dir)
 
-import requests
-from dotenv import load_dotenv
+# requests and dotenv are imported on first use, so loading the add-on at
+# Anki startup only registers the menu hooks.
 from aqt import mw
 from aqt.qt import QAction, QInputDialog, QDialog, \
-    QVBoxLayout, QProgressBar, QApplication, \
+    QVBoxLayout, QProgressBar, QObject, pyqtSignal, \
     QEventLoop, QTimer
 from aqt.utils import showInfo
 from aqt import gui_hooks
 
-# Load environment variables from .env file(s) if they exist.
-# We explicitly point to the addon directory so Anki's working directory does not matter.
-load_dotenv(os.path.join(_addon_dir, ".env"), override=False)
-if os.path.isdir(_user_files_dir):
-    load_dotenv(os.path.join(_user_files_dir, ".env"), override=False)
+# orjson is optional: used for request/response bodies when it is installed.
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
 
+    def _json_dumps(obj):
+        return json.dumps(obj).encode("utf-8")
 
 # ——— Load Configuration ———
 DEFAULT_PROMPT_TEMPLATE = (
@@ -35,134 +47,334 @@ DEFAULT_PROMPT_TEMPLATE = (
     "{level} based on CEFR. Return only the sentence."
 )
 
-LLM_PROVIDER = (os.getenv("LLM_PROVIDER") or "openai").strip().lower()
+CEFR_LEVELS = ('A1', 'A2', 'B1', 'B2', 'C1', 'C2')
 
-# OpenAI settings
-API_KEY = (os.getenv("OPENAI_API_KEY") or "").strip()
-API_URL = (os.getenv("OPENAI_API_URL") or "https://api.openai.com/v1/chat/completions").strip()
-AI_MODEL = (os.getenv("OPENAI_MODEL") or "").strip()
+BATCH_PROMPT_HEADER = (
+    "Complete each of the following {count} numbered tasks independently. "
+    "Reply with exactly one line per task, starting with the task number and a "
+    "period, and nothing else."
+)
 
-# Ollama (local SLM) settings
-OLLAMA_URL = (os.getenv("OLLAMA_URL") or "http://localhost:11434/api/chat").strip()
-OLLAMA_MODEL = (os.getenv("OLLAMA_MODEL") or "gemma3:1b").strip()
+@dataclass(frozen=True)
+class LLMConfig:
+    """Settings resolved from the environment and the add-on's .env files."""
+    provider: str
+    api_key: str
+    api_url: str
+    model: str
+    ollama_url: str
+    ollama_model: str
+    prompt_template: str
+    temperature: float
+    concurrency: int
+    batch_size: int
+    max_tokens: int
 
-PROMPT_TEMPLATE = (
-    os.getenv("OPENAI_PROMPT_TEMPLATE")
-    or os.getenv("OLLAMA_PROMPT_TEMPLATE")
-    or DEFAULT_PROMPT_TEMPLATE
-)
-try:
-    TEMPERATURE = float(os.getenv("OPENAI_TEMPERATURE"))
-except (TypeError, ValueError):
-    TEMPERATURE = 1.5
+@lru_cache(maxsize=1)
+def get_config():
+    """Read the configuration once, on first use rather than at add-on load."""
+    from dotenv import load_dotenv
+
+    # Load environment variables from .env file(s) if they exist.
+    # We explicitly point to the addon directory so Anki's working directory does not matter.
+    load_dotenv(os.path.join(_addon_dir, ".env"), override=False)
+    if os.path.isdir(_user_files_dir):
+        load_dotenv(os.path.join(_user_files_dir, ".env"), override=False)
+
+    try:
+        temperature = float(os.getenv("OPENAI_TEMPERATURE"))
+    except (TypeError, ValueError):
+        temperature = 1.5
+    # Number of sentence requests kept in flight at once
+    try:
+        concurrency = max(1, int(os.getenv("MCQ_CONCURRENCY")))
+    except (TypeError, ValueError):
+        concurrency = 8
+    # Number of words sent to the model in a single request
+    try:
+        batch_size = max(1, int(os.getenv("MCQ_BATCH_SIZE")))
+    except (TypeError, ValueError):
+        batch_size = 10
+    # Optional completion token cap per sentence (OPENAI_MAX_TOKENS, e.g. 60; a
+    # blanked sentence needs well under that). Off by default: it is sent as
+    # max_tokens (num_predict for Ollama), which OpenAI reasoning models reject.
+    try:
+        max_tokens = max(0, int(os.getenv("OPENAI_MAX_TOKENS")))
+    except (TypeError, ValueError):
+        max_tokens = 0
+
+    return LLMConfig(
+        provider=(os.getenv("LLM_PROVIDER") or "openai").strip().lower(),
+        # OpenAI settings
+        api_key=(os.getenv("OPENAI_API_KEY") or "").strip(),
+        api_url=(os.getenv("OPENAI_API_URL") or "https://api.openai.com/v1/chat/completions").strip(),
+        model=(os.getenv("OPENAI_MODEL") or "").strip(),
+        # Ollama (local SLM) settings
+        ollama_url=(os.getenv("OLLAMA_URL") or "http://localhost:11434/api/chat").strip(),
+        ollama_model=(os.getenv("OLLAMA_MODEL") or "gemma3:1b").strip(),
+        prompt_template=(
+            os.getenv("OPENAI_PROMPT_TEMPLATE")
+            or os.getenv("OLLAMA_PROMPT_TEMPLATE")
+            or DEFAULT_PROMPT_TEMPLATE
+        ),
+        temperature=temperature,
+        concurrency=concurrency,
+        batch_size=batch_size,
+        max_tokens=max_tokens,
+    )
+
+@lru_cache(maxsize=8)
+def compile_prompt_template(template):
+    """Parse a prompt template once into a ``render(word, level)`` callable."""
+    parts = []
+    for literal, field, spec, conversion in string.Formatter().parse(template):
+        if field is not None and (spec or conversion or field not in ("word", "level")):
+            # Anything beyond plain {word}/{level} keeps full str.format semantics.
+            return lambda word, level: template.format(word=word, level=level)
+        parts.append((literal, field))
+
+    def render(word, level):
+        values = {"word": word, "level": level}
+        return "".join(
+            literal + values[field] if field is not None else literal
+            for literal, field in parts
+        )
+    return render
+
+# One pooled session shared by all worker threads, so repeated calls reuse
+# open keep-alive connections instead of paying a TCP/TLS handshake each time.
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+def _get_session():
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=0)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _SESSION = session
+    return _SESSION
+
+def _on_gui_thread():
+    return threading.current_thread() is threading.main_thread()
+
+def _notify(msg):
+    """Show a message on the GUI thread; worker threads must not touch Qt directly."""
+    if _on_gui_thread():
+        showInfo(msg)
+    else:
+        mw.taskman.run_on_main(lambda: showInfo(msg))
 
 def non_blocking_wait(seconds):
+    """Wait without freezing the GUI, or simply block when called from a worker thread."""
+    if _on_gui_thread():
+        _gui_wait(seconds)
+    else:
+        _worker_wait(seconds)
+
+def _gui_wait(seconds):
     loop = QEventLoop()
     QTimer.singleShot(int(seconds * 1000), loop.quit)
     loop.exec()
 
+def _worker_wait(seconds):
+    # No nested event loop here: it would need Qt in this thread and could re-enter handlers.
+    threading.Event().wait(seconds)
+
 # ——— Core API Call with Retry Logic ———
-def generate_sentence_for_word(word, max_retries=5):
+def generate_sentence_for_word(word, cfg=None, max_retries=5):
     """
     Call OpenAI API to generate a sentence with a blank for the given word/phrase.
     Implements retry logic on HTTP 429 errors.
     Returns the sentence as plain text.
     """
-    import time
+    cfg = cfg or get_config()
 
-    level = random.choice(['A1', 'A2', 'B1', 'B2', 'C1', 'C2'])
+    level = random.choice(CEFR_LEVELS)
     try:
-        prompt = PROMPT_TEMPLATE.format(word=word, level=level)
+        prompt = compile_prompt_template(cfg.prompt_template)(word, level)
     except Exception as e:
-        showInfo(f"Prompt template is invalid: {e}")
+        _notify(f"Prompt template is invalid: {e}")
         return None
+    return complete_prompt(prompt, cfg, max_retries)
 
-    if LLM_PROVIDER == "ollama":
-        if not OLLAMA_MODEL:
-            showInfo("Ollama model is not configured. Set OLLAMA_MODEL in your .env file.")
-            return None
-        payload = {
-            "model": OLLAMA_MODEL,
-            "messages": [{"role": "user", "content": prompt}],
-            "options": {"temperature": TEMPERATURE},
-            "stream": False,
-        }
-        try:
-            res = requests.post(OLLAMA_URL, json=payload, timeout=60)
-            res.raise_for_status()
-            data = res.json()
-            content = ""
-            if isinstance(data, dict):
-                if "message" in data and isinstance(data["message"], dict):
-                    content = data["message"].get("content", "")
-                elif "content" in data:
-                    content = data["content"]
-            content = (content or "").strip()
-            if not content:
-                showInfo("Ollama returned an empty response.")
-                return None
-            return content
-        except requests.exceptions.RequestException as e:
-            showInfo(f"HTTP error when calling Ollama: {e}")
-            return None
-        except Exception as e:
-            showInfo(f"Error processing Ollama response: {e}")
-            return None
+_NUMBERED_LINE = re.compile(r"^\s*(\d+)[.):]\s*(.+?)\s*$")
+
+def generate_sentences_for_words(words, cfg=None, max_retries=5):
+    """
+    Generate sentences for several words with a single API request.
+    Returns a list aligned with `words`. Words the reply does not answer
+    are retried one at a time; None marks a word that still failed.
+    """
+    cfg = cfg or get_config()
+    if len(words) == 1:
+        return [generate_sentence_for_word(words[0], cfg, max_retries)]
+
+    try:
+        render = compile_prompt_template(cfg.prompt_template)
+        tasks = [render(word, random.choice(CEFR_LEVELS)) for word in words]
+    except Exception as e:
+        _notify(f"Prompt template is invalid: {e}")
+        return [None] * len(words)
+    prompt = "\n".join(
+        [BATCH_PROMPT_HEADER.format(count=len(words))]
+        + [f"{i}. {task}" for i, task in enumerate(tasks, start=1)]
+    )
+    content = complete_prompt(prompt, cfg, max_retries, sentences=len(words))
+    if content is None:
+        return [None] * len(words)
+
+    sentences = [None] * len(words)
+    for line in content.splitlines():
+        match = _NUMBERED_LINE.match(line)
+        if match:
+            index = int(match.group(1)) - 1
+            if 0 <= index < len(words) and sentences[index] is None:
+                sentences[index] = match.group(2)
+    return [
+        sentence if sentence else generate_sentence_for_word(word, cfg, max_retries)
+        for word, sentence in zip(words, sentences)
+    ]
+
+def complete_prompt(prompt, cfg, max_retries=5, sentences=1):
+    """
+    Send a single prompt to the configured provider and return the reply text.
+    The reply is capped at `cfg.max_tokens` per expected sentence (0 disables the cap).
+    """
+    max_tokens = cfg.max_tokens * sentences
+    return _PROVIDER_CALLS.get(cfg.provider, _call_openai)(prompt, cfg, max_retries, max_tokens)
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+def _call_ollama(prompt, cfg, max_retries, max_tokens):
+    from requests.exceptions import RequestException
 
-    if not API_KEY:
-        showInfo("OpenAI API key is not configured. Set it via .env or user_files/api_key.txt.")
+    if not cfg.ollama_model:
+        _notify("Ollama model is not configured. Set OLLAMA_MODEL in your .env file.")
+        return None
+    payload = {
+        "model": cfg.ollama_model,
+        "messages": [{"role": "user", "content": prompt}],
+        "options": {"temperature": cfg.temperature},
+        "stream": False,
+    }
+    if max_tokens:
+        payload["options"]["num_predict"] = max_tokens
+    try:
+        res = _get_session().post(
+            cfg.ollama_url, data=_json_dumps(payload), headers=_JSON_HEADERS, timeout=60)
+        res.raise_for_status()
+        data = _json_loads(res.content)
+        content = ""
+        if isinstance(data, dict):
+            if "message" in data and isinstance(data["message"], dict):
+                content = data["message"].get("content", "")
+            elif "content" in data:
+                content = data["content"]
+        content = (content or "").strip()
+        if not content:
+            _notify("Ollama returned an empty response.")
+            return None
+        return content
+    except RequestException as e:
+        _notify(f"HTTP error when calling Ollama: {e}")
         return None
-    if not AI_MODEL:
-        showInfo("OpenAI model is not configured. Set it via .env or user_files/model.txt.")
+    except Exception as e:
+        _notify(f"Error processing Ollama response: {e}")
         return None
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
+
+@lru_cache(maxsize=4)
+def _openai_headers(api_key):
+    return {
+        "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json"
     }
+
+def _call_openai(prompt, cfg, max_retries, max_tokens):
+    from requests.exceptions import RequestException
+
+    if not cfg.api_key:
+        _notify("OpenAI API key is not configured. Set it via .env or user_files/api_key.txt.")
+        return None
+    if not cfg.model:
+        _notify("OpenAI model is not configured. Set it via .env or user_files/model.txt.")
+        return None
+    headers = _openai_headers(cfg.api_key)
     payload = {
-        "model": AI_MODEL,  # Example: "gpt-3.5-turbo" or "gpt-4o-mini"
+        "model": cfg.model,  # Example: "gpt-3.5-turbo" or "gpt-4o-mini"
         "messages": [{"role": "user", "content": prompt}],
-        "temperature": TEMPERATURE
+        "temperature": cfg.temperature
     }
+    if max_tokens:
+        payload["max_tokens"] = max_tokens
+    # Serialise once; retries after a 429 resend the same bytes.
+    body = _json_dumps(payload)
 
     retries = 0
     while retries <= max_retries:
         try:
-            res = requests.post(API_URL, headers=headers, json=payload)
+            res = _get_session().post(cfg.api_url, headers=headers, data=body)
             if res.status_code == 429:
                 wait_time = 30
-                showInfo(f"Rate limit reached. Retrying in {wait_time} seconds...")
+                _notify(f"Rate limit reached. Retrying in {wait_time} seconds...")
                 non_blocking_wait(wait_time)
                 retries += 1
                 continue
             res.raise_for_status()
-            data = res.json()
+            data = _json_loads(res.content)
             content = data["choices"][0]["message"]["content"].strip()
             return content
-        except requests.exceptions.RequestException as e:
-            showInfo(f"HTTP error: {e}")
+        except RequestException as e:
+            _notify(f"HTTP error: {e}")
             retries += 1
             if retries > max_retries:
                 raise
             time.sleep(3)
         except Exception as e:
-            showInfo(f"Error processing response: {e}")
+            _notify(f"Error processing response: {e}")
             raise
 
-    showInfo("Maximum retries exceeded. Please try again later.")
+    _notify("Maximum retries exceeded. Please try again later.")
     return None
 
+_PROVIDER_CALLS = {"openai": _call_openai, "ollama": _call_ollama}
+
 # ——— Helpers ———
 def get_all_deck_words(did):
     """Collect the 'Word' field from all notes in the given deck."""
-    cids = mw.col.decks.cids(did)
-    words = []
-    for cid in cids:
-        note = mw.col.getCard(cid).note()
-        w = note['Word'].strip()
+    # The collection mod time changes on every write, so it keys out stale entries.
+    return list(_cached_deck_words(did, mw.col.mod))
+
+@lru_cache(maxsize=32)
+def _cached_deck_words(did, mod_stamp):
+    return tuple(_scan_deck_words(did))
+
+def _scan_deck_words(did):
+    # One query for the whole deck instead of loading every card and note.
+    rows = mw.col.db.all(
+        "select distinct n.id, n.mid, n.flds from notes n "
+        "join cards c on c.nid = n.id where c.did = ? order by n.id",
+        did,
+    )
+    word_idx = {}
+    # A dict de-duplicates like a set but keeps a stable, insertion order.
+    words = {}
+    for _nid, mid, flds in rows:
+        if mid not in word_idx:
+            names = [f['name'] for f in mw.col.models.get(mid)['flds']]
+            word_idx[mid] = names.index('Word') if 'Word' in names else None
+        idx = word_idx[mid]
+        if idx is None:
+            continue
+        w = flds.split("\x1f")[idx].strip()
         if w:
-            words.append(w)
-    return list(set(words))
+            words[w] = None
+    return list(words)
 
 def create_progress_dialog(total_tasks):
     """Create and display a progress dialog."""
@@ -189,37 +401,94 @@ def generate_mcq_for_cards(cids):
         showInfo("Need at least 4 notes with 'Word' field in deck for MCQ generation.")
         return
 
-    dialog, progress_bar = create_progress_dialog(len(cids))
-
-    for index, cid in enumerate(cids, start=1):
+    # Touch the collection only on the main thread; workers just do HTTP.
+    jobs = []
+    for cid in cids:
         note = mw.col.getCard(cid).note()
         word = note['Word'].strip()
         if not word:
             continue
-        others = [w for w in deck_words if w != word]
-        distractors = random.sample(others, 3)
-        try:
-            sentence = generate_sentence_for_word(word)
-            if sentence is None:
-                continue
-        except Exception as e:
-            showInfo(f"Error calling API: {e}")
-            dialog.close()
-            mw.col.reset()
-            return
+        # Deck words are unique, so at most one of four picks is the answer.
+        picks = random.sample(deck_words, 4)
+        jobs.append((note, word, [w for w in picks if w != word][:3]))
+
+    dialog, progress_bar = create_progress_dialog(len(jobs))
+    signals = GenerationSignals(dialog)
+    signals.progress.connect(progress_bar.setValue)
+    signals.finished.connect(
+        lambda results, error: on_generation_finished(dialog, results, error))
+    threading.Thread(target=run_generation, args=(jobs, signals), daemon=True).start()
+
+class GenerationSignals(QObject):
+    """Carries progress from the generation thread back to the GUI thread."""
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(object, object)
+
+def run_generation(jobs, signals):
+    """Fetch sentences for all jobs off the GUI thread, emitting progress as they complete."""
+    results = []
+    error = None
+    # finished must always fire: it is what closes the modal progress dialog
+    try:
+        cfg = get_config()
+        batches = [jobs[i:i + cfg.batch_size] for i in range(0, len(jobs), cfg.batch_size)]
+        done = 0
+        with ThreadPoolExecutor(max_workers=cfg.concurrency) as executor:
+            futures = {
+                executor.submit(generate_sentences_for_words, [word for _, word, _ in batch], cfg): batch
+                for batch in batches
+            }
+            for future in as_completed(futures):
+                try:
+                    sentences = future.result()
+                except Exception as e:
+                    for pending in futures:
+                        pending.cancel()
+                    error = e
+                    break
+                batch = futures[future]
+                done += len(batch)
+                signals.progress.emit(done)
+                results.extend(
+                    (job, sentence) for job, sentence in zip(batch, sentences)
+                    if sentence is not None
+                )
+    except Exception as e:
+        error = e
+    finally:
+        signals.finished.emit(results, error)
+
+def on_generation_finished(dialog, results, error):
+    """Write generated MCQs into their notes; runs on the GUI thread."""
+    modified = []
+    for (note, word, distractors), sentence in results:
         options = [word] + distractors
         random.shuffle(options)
         note['SentenceBlank'] = sentence
         note['OptionA'], note['OptionB'], note['OptionC'], note['OptionD'] = options
         note['Answer'] = word
-        note.flush()
-        progress_bar.setValue(index)
-        QApplication.processEvents()  # Update the UI
+        modified.append(note)
+    save_notes(modified)
 
     dialog.close()
     mw.col.reset()
+    if error is not None:
+        showInfo(f"Error calling API: {error}")
+        return
     showInfo("MCQs generated. Sync to AnkiWeb to review from elsewhere.")
 
+def save_notes(notes):
+    """Write all modified notes in one collection transaction."""
+    if not notes:
+        return
+    if hasattr(mw.col, "update_notes"):
+        mw.col.update_notes(notes)
+    else:
+        # Anki < 2.1.45: flush each note, but commit once at the end.
+        for note in notes:
+            note.flush()
+        mw.col.save()
+
 # ——— Menu Actions ———
 def on_generate_for_current(browser):
     cids = browser.selectedCards()
@@ -5,15 +5,34 @@ This allows testing without loading Anki.
 
 Usage:
     python3 test_main.py
+
+    # Send large runs through the OpenAI Batch API (half price, up to 24h):
+    python3 test_main.py --batch
+
+Sentence requests are sent concurrently (MCQ_CONCURRENCY, default 8):
+with aiohttp when it is installed, otherwise from a thread pool.
 """
 
 import random
 import sys
 import os
 import csv
+import gc
 import json
+import re
+import string
 import time
-from typing import List, Dict, Optional
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Dict, Optional
+from urllib.parse import urlsplit
 
 # Mock Anki components
 class MockMW:
@@ -60,12 +79,24 @@ sys.modules['aqt'].gui_hooks = type(sys)('gui_hooks')
 
 # Import the actual functions from main.py
 import requests
-from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+# aiohttp is optional: without it requests fan out over a thread pool instead.
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# orjson is optional: used for request/response bodies when it is installed (as in main.py).
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
 
-# Load environment variables using explicit paths to match main.py behavior
-load_dotenv(os.path.join(_addon_dir, ".env"), override=False)
-if os.path.isdir(_user_files_dir):
-    load_dotenv(os.path.join(_user_files_dir, ".env"), override=False)
+    def _json_dumps(obj):
+        return json.dumps(obj).encode("utf-8")
 
 # Load config (for any non-secret defaults the user may keep there)
 config = MockMW().addonManager
@@ -77,27 +108,92 @@ DEFAULT_PROMPT = (
     "{level} based on CEFR. Return only the sentence."
 )
 
-LLM_PROVIDER = (os.getenv("LLM_PROVIDER") or "openai").strip().lower()
 
-# OpenAI settings
-API_KEY = (os.getenv("OPENAI_API_KEY") or "").strip()
-API_URL = (os.getenv("OPENAI_API_URL") or "https://api.openai.com/v1/chat/completions").strip()
-AI_MODEL = (os.getenv("OPENAI_MODEL") or "").strip()
+@dataclass(frozen=True)
+class LLMConfig:
+    """Settings resolved from the environment and the .env files."""
+    provider: str
+    api_key: str
+    api_url: str
+    model: str
+    ollama_url: str
+    ollama_model: str
+    prompt_template: str
+    temperature: float
+    concurrency: int
+    rpm: int
+    batch_size: int
+    batch_threshold: int
+    sentence_cache: bool
+    semantic_cache: bool
+    semantic_model: str
+    semantic_threshold: float
 
-# Ollama (local SLM) settings
-OLLAMA_URL = (os.getenv("OLLAMA_URL") or "http://localhost:11434/api/chat").strip()
-OLLAMA_MODEL = (os.getenv("OLLAMA_MODEL") or "gemma3:1b").strip()
 
-# Prompt + sampling settings
-PROMPT_TEMPLATE = (
-    os.getenv("OPENAI_PROMPT_TEMPLATE")
-    or os.getenv("OLLAMA_PROMPT_TEMPLATE")
-    or DEFAULT_PROMPT
-)
-try:
-    TEMPERATURE = float(os.getenv("OPENAI_TEMPERATURE"))
-except (TypeError, ValueError):
-    TEMPERATURE = 1.5
+def _env_number(name: str, convert, default):
+    try:
+        return convert(os.getenv(name))
+    except (TypeError, ValueError):
+        return default
+
+
+@lru_cache(maxsize=1)
+def get_config() -> LLMConfig:
+    """Read the configuration once, on first use rather than at import."""
+    from dotenv import load_dotenv
+
+    # Load environment variables using explicit paths to match main.py behavior
+    load_dotenv(os.path.join(_addon_dir, ".env"), override=False)
+    if os.path.isdir(_user_files_dir):
+        load_dotenv(os.path.join(_user_files_dir, ".env"), override=False)
+
+    return LLMConfig(
+        provider=(os.getenv("LLM_PROVIDER") or "openai").strip().lower(),
+        # OpenAI settings
+        api_key=(os.getenv("OPENAI_API_KEY") or "").strip(),
+        api_url=(os.getenv("OPENAI_API_URL") or "https://api.openai.com/v1/chat/completions").strip(),
+        model=(os.getenv("OPENAI_MODEL") or "").strip(),
+        # Ollama (local SLM) settings
+        ollama_url=(os.getenv("OLLAMA_URL") or "http://localhost:11434/api/chat").strip(),
+        ollama_model=(os.getenv("OLLAMA_MODEL") or "gemma3:1b").strip(),
+        # Prompt + sampling settings
+        prompt_template=(
+            os.getenv("OPENAI_PROMPT_TEMPLATE")
+            or os.getenv("OLLAMA_PROMPT_TEMPLATE")
+            or DEFAULT_PROMPT
+        ),
+        temperature=_env_number("OPENAI_TEMPERATURE", float, 1.5),
+        # Number of sentence requests kept in flight at once
+        concurrency=max(1, _env_number("MCQ_CONCURRENCY", int, 8)),
+        # OpenAI requests per minute across all concurrent requests; 0 disables the limit
+        rpm=max(0, _env_number("OPENAI_RPM", int, 500)),
+        # Number of same-level words sent to the model in a single request (as in main.py)
+        batch_size=max(1, _env_number("MCQ_BATCH_SIZE", int, 10)),
+        # OpenAI Batch API: used with --batch once at least this many words need sentences
+        batch_threshold=max(1, _env_number("MCQ_BATCH_THRESHOLD", int, 50)),
+        # Generated sentences are cached on disk; set MCQ_SENTENCE_CACHE=0 to always call the LLM
+        sentence_cache=os.getenv("MCQ_SENTENCE_CACHE", "1").strip() != "0",
+        # Optional semantic cache: reuse the sentence of a near-identical word (e.g. "run"/"runs").
+        # Needs faiss and sentence-transformers; off by default because a reused sentence
+        # was written for a different word. Enable with MCQ_SEMANTIC_CACHE=1.
+        semantic_cache=os.getenv("MCQ_SEMANTIC_CACHE", "0").strip() == "1",
+        semantic_model=os.getenv("MCQ_SEMANTIC_MODEL", "all-MiniLM-L6-v2"),
+        semantic_threshold=_env_number("MCQ_SEMANTIC_THRESHOLD", float, 0.92),
+    )
+
+
+BATCH_POLL_INTERVAL = 30
+BATCH_FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+# One pooled session for all sync calls, so sockets are reused between requests
+_HTTP = requests.Session()
+_http_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=0)
+_HTTP.mount("https://", _http_adapter)
+_HTTP.mount("http://", _http_adapter)
+
+SENTENCE_CACHE_PATH = os.path.join(_user_files_dir, 'sentence_cache.db')
+SEMANTIC_INDEX_PATH = os.path.join(_user_files_dir, 'sem_cache.faiss')
+SEMANTIC_ENTRIES_PATH = os.path.join(_user_files_dir, 'sem_cache.json')
 
 
 def show_info(msg):
@@ -106,47 +202,423 @@ def show_info(msg):
 
 
 def non_blocking_wait(seconds):
-    """Mock non-blocking wait - just print"""
-    print(f"[WAIT] Waiting {seconds} seconds...")
+    """Mock non-blocking wait - a plain sleep outside Anki"""
+    print(f"[WAIT] Waiting {seconds:.1f} seconds...")
+    time.sleep(seconds)
 
 
-# Core API Call with Retry Logic (from main.py)
-def generate_sentence_for_word(word: str, max_retries: int = 5) -> Optional[str]:
+# Retry policy: exponential backoff with full jitter, capped, honoring Retry-After
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+
+def _retry_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Seconds to wait before retry number `attempt` (0-based)."""
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass  # HTTP-date form; fall back to our own backoff
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+class RateLimiter:
+    """Thread-safe token bucket allowing `rate` calls per `period` seconds."""
+
+    def __init__(self, rate: float, period: float = 60.0):
+        self._interval = period / rate
+        # Allow roughly one second's worth of calls as a burst
+        self._capacity = max(1.0, rate / period)
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token and return how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated) / self._interval)
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens * self._interval)
+
+    def acquire(self):
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+@lru_cache(maxsize=2)
+def _rate_limiter(rpm: int) -> Optional[RateLimiter]:
+    """The limiter shared by every OpenAI request, or None when unlimited."""
+    return RateLimiter(rpm) if rpm > 0 else None
+
+
+CEFR_LEVELS = ('A1', 'A2', 'B1', 'B2', 'C1', 'C2')
+
+
+def _pick_level() -> str:
+    return random.choice(CEFR_LEVELS)
+
+
+@lru_cache(maxsize=8)
+def _compile_prompt_template(template: str):
+    """Parse a prompt template once into a ``render(word, level)`` callable (as in main.py)."""
+    parts = []
+    for literal, field, spec, conversion in string.Formatter().parse(template):
+        if field is not None and (spec or conversion or field not in ("word", "level")):
+            # Anything beyond plain {word}/{level} keeps full str.format semantics.
+            return lambda word, level: template.format(word=word, level=level)
+        parts.append((literal, field))
+
+    def render(word: str, level: str) -> str:
+        values = {"word": word, "level": level}
+        return "".join(
+            literal + values[field] if field is not None else literal
+            for literal, field in parts
+        )
+    return render
+
+
+def _render_prompt(word: str, level: str) -> str:
+    """Fill the prompt template for a word at the given CEFR level."""
+    return _compile_prompt_template(get_config().prompt_template)(word, level)
+
+
+_cache_conn = None
+_cache_lock = threading.Lock()
+
+
+def _cache_db() -> sqlite3.Connection:
+    """Open (and create if needed) the sentence cache database."""
+    global _cache_conn
+    if _cache_conn is None:
+        os.makedirs(_user_files_dir, exist_ok=True)
+        conn = sqlite3.connect(SENTENCE_CACHE_PATH, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, content TEXT NOT NULL)")
+        _cache_conn = conn
+    return _cache_conn
+
+
+def _cache_context(prompt: Optional[str] = None) -> str:
     """
-    Call OpenAI API to generate a sentence with a blank for the given word/phrase.
-    Implements retry logic on HTTP 429 errors.
-    Returns the sentence as plain text.
+    Everything besides word and level that shapes a generated sentence.
+    `prompt` names the prompt that produced it when that is not the
+    configured template (e.g. BUCKET_SYSTEM_PROMPT).
     """
-    import time
+    cfg = get_config()
+    model = cfg.ollama_model if cfg.provider == "ollama" else cfg.model
+    return f"{cfg.provider}|{model}|{prompt or cfg.prompt_template}|{cfg.temperature}"
+
+
+def _cache_key(word: str, level: str, prompt: Optional[str] = None) -> str:
+    raw = f"{_cache_context(prompt)}|{word}|{level}"
+    return hashlib.blake2b(raw.encode("utf-8")).hexdigest()
+
+
+def cache_get(word: str, level: str, prompt: Optional[str] = None) -> Optional[str]:
+    """Return a previously generated sentence for (word, level), if any."""
+    if not get_config().sentence_cache:
+        return None
+    with _cache_lock:
+        row = _cache_db().execute(
+            "SELECT content FROM cache WHERE key = ?", (_cache_key(word, level, prompt),)
+        ).fetchone()
+    return row[0] if row else None
+
+
+def cache_put(word: str, level: str, content: str, prompt: Optional[str] = None):
+    """Store a generated sentence for (word, level)."""
+    if not get_config().sentence_cache:
+        return
+    with _cache_lock:
+        db = _cache_db()
+        db.execute(
+            "INSERT OR REPLACE INTO cache (key, content) VALUES (?, ?)",
+            (_cache_key(word, level, prompt), content),
+        )
+        db.commit()
+
+
+class SemanticCache:
+    """Nearest-neighbour sentence cache over embeddings of "word|level"."""
+
+    def __init__(self, index_path: str, entries_path: str, threshold: float, model_name: str):
+        import faiss
+        from sentence_transformers import SentenceTransformer
+
+        self._faiss = faiss
+        self._model = SentenceTransformer(model_name)
+        self._index_path = index_path
+        self._entries_path = entries_path
+        self._threshold = threshold
+        self._lock = threading.Lock()
+        self._dirty = False
+        if os.path.exists(index_path) and os.path.exists(entries_path):
+            self._index = faiss.read_index(index_path)
+            with open(entries_path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        else:
+            # Inner product over normalized vectors is cosine similarity
+            self._index = faiss.IndexFlatIP(self._model.get_sentence_embedding_dimension())
+            self._entries = []
+
+    def _embed(self, word: str, level: str):
+        return self._model.encode([f"{word}|{level}"], normalize_embeddings=True).astype('float32')
+
+    def get(self, word: str, level: str, prompt: Optional[str] = None) -> Optional[str]:
+        vector = self._embed(word, level)
+        context = _cache_context(prompt)
+        with self._lock:
+            if self._index.ntotal == 0:
+                return None
+            scores, ids = self._index.search(vector, min(5, self._index.ntotal))
+            for score, i in zip(scores[0], ids[0]):
+                if i < 0 or score < self._threshold:
+                    break
+                entry = self._entries[i]
+                # Only reuse sentences made with the same model, prompt and level
+                if entry['context'] == context and entry['level'] == level:
+                    return entry['sentence']
+        return None
+
+    def put(self, word: str, level: str, sentence: str, prompt: Optional[str] = None):
+        """Add an entry in memory; save() writes the new entries to disk."""
+        vector = self._embed(word, level)
+        with self._lock:
+            self._index.add(vector)
+            self._entries.append({
+                'word': word, 'level': level, 'context': _cache_context(prompt), 'sentence': sentence,
+            })
+            self._dirty = True
+
+    def save(self):
+        """Write the index and entries to disk, once per run rather than per sentence."""
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(os.path.dirname(self._index_path), exist_ok=True)
+            self._faiss.write_index(self._index, self._index_path)
+            with open(self._entries_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f)
+            self._dirty = False
+
+
+_semantic_cache = None
+_semantic_cache_unavailable = False
+_semantic_cache_lock = threading.Lock()
+
+
+def _get_semantic_cache() -> Optional[SemanticCache]:
+    """Build the semantic cache on first use; None if disabled or unavailable."""
+    global _semantic_cache, _semantic_cache_unavailable
+    cfg = get_config()
+    if not cfg.semantic_cache or _semantic_cache_unavailable:
+        return None
+    with _semantic_cache_lock:
+        if _semantic_cache is None and not _semantic_cache_unavailable:
+            try:
+                _semantic_cache = SemanticCache(
+                    SEMANTIC_INDEX_PATH, SEMANTIC_ENTRIES_PATH,
+                    cfg.semantic_threshold, cfg.semantic_model)
+            except ImportError as e:
+                print(f"[WARNING] Semantic cache disabled, missing dependency: {e}")
+                _semantic_cache_unavailable = True
+            except Exception as e:
+                # e.g. the embedding model cannot be downloaded while offline
+                print(f"[WARNING] Semantic cache disabled, could not load it: {e}")
+                _semantic_cache_unavailable = True
+    return _semantic_cache
+
+
+def save_semantic_cache():
+    """Persist sentences added to the semantic cache during this run, if it was used."""
+    if _semantic_cache is not None:
+        _semantic_cache.save()
+
+
+def lookup_cached_sentence(word: str, level: str, prompt: Optional[str] = None) -> Optional[str]:
+    """Check the exact cache, then the semantic cache, for a reusable sentence."""
+    cached = cache_get(word, level, prompt)
+    if cached is not None:
+        print(f"[CACHE] Reusing sentence for '{word}' ({level}): {cached}")
+        return cached
+    semantic = _get_semantic_cache()
+    if semantic is not None:
+        cached = semantic.get(word, level, prompt)
+        if cached is not None:
+            print(f"[CACHE] Reusing similar-word sentence for '{word}' ({level}): {cached}")
+            return cached
+    return None
+
 
-    level = random.choice(['A1', 'A2', 'B1', 'B2', 'C1', 'C2'])
-    prompt = PROMPT_TEMPLATE.format(word=word, level=level)
+def remember_sentence(word: str, level: str, content: str, prompt: Optional[str] = None):
+    """Store a freshly generated sentence in every enabled cache."""
+    cache_put(word, level, content, prompt)
+    semantic = _get_semantic_cache()
+    if semantic is not None:
+        semantic.put(word, level, content, prompt)
 
-    if LLM_PROVIDER == "ollama":
-        if not OLLAMA_MODEL:
+
+def _user_message(prompt: str) -> List[Dict[str, str]]:
+    return [{"role": "user", "content": prompt}]
+
+
+def _ollama_payload(cfg: LLMConfig, messages: List[Dict[str, str]]) -> Dict:
+    return {
+        "model": cfg.ollama_model,
+        "messages": messages,
+        "options": {"temperature": cfg.temperature},
+        "stream": True,
+    }
+
+
+def _ollama_stream_chunk(line: bytes):
+    """Parse one NDJSON line of an Ollama chat stream into (text, done)."""
+    if not line.strip():
+        return "", False
+    data = _json_loads(line)
+    if "error" in data:
+        raise ValueError(data["error"])
+    # Depending on Ollama version, `message` may be nested differently.
+    content = ""
+    if "message" in data and isinstance(data["message"], dict):
+        content = data["message"].get("content", "")
+    elif "content" in data:
+        content = data["content"]
+    return content or "", bool(data.get("done"))
+
+
+def _openai_stream_chunk(line: bytes):
+    """Parse one server-sent event line of an OpenAI chat stream into (text, done)."""
+    if not line.startswith(b"data:"):
+        return "", False
+    data = line[5:].strip()
+    if data == b"[DONE]":
+        return "", True
+    # finish_reason arrives one event before [DONE]; only [DONE] ends the stream
+    choices = _json_loads(data).get("choices") or [{}]
+    delta = choices[0].get("delta") or {}
+    return delta.get("content") or "", False
+
+
+def _read_stream(lines, parse_chunk) -> str:
+    """Concatenate streamed deltas, reading the body to the end so the pooled
+    connection is released instead of closed."""
+    parts = []
+    done = False
+    for line in lines:
+        if done:
+            continue
+        text, done = parse_chunk(line)
+        parts.append(text)
+    return "".join(parts).strip()
+
+
+async def _read_stream_async(lines, parse_chunk) -> str:
+    parts = []
+    done = False
+    async for line in lines:
+        if done:
+            continue
+        text, done = parse_chunk(line)
+        parts.append(text)
+    return "".join(parts).strip()
+
+
+def _openai_headers(cfg: LLMConfig) -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {cfg.api_key}",
+        "Content-Type": "application/json"
+    }
+
+
+def _openai_payload(cfg: LLMConfig, messages: List[Dict[str, str]], stream: bool = False) -> Dict:
+    payload = {
+        "model": cfg.model,
+        "messages": messages,
+        "temperature": cfg.temperature
+    }
+    # The Batch API rejects streaming bodies, so only live requests stream
+    if stream:
+        payload["stream"] = True
+    return payload
+
+
+_PROMPT_MARKER = "\x00prompt\x00"
+
+
+def _split_payload(payload: Dict):
+    """Serialize a payload whose prompt is _PROMPT_MARKER into (prefix, suffix) bytes."""
+    prefix, suffix = _json_dumps(payload).split(_json_dumps(_PROMPT_MARKER))
+    return prefix, suffix
+
+
+# Model, temperature and message envelope never change between calls, so they
+# are serialized once per config; each request only JSON-encodes its prompt string.
+@lru_cache(maxsize=2)
+def _ollama_body(cfg: LLMConfig):
+    return _split_payload(_ollama_payload(cfg, _user_message(_PROMPT_MARKER)))
+
+
+@lru_cache(maxsize=2)
+def _openai_body(cfg: LLMConfig):
+    return _split_payload(_openai_payload(cfg, _user_message(_PROMPT_MARKER), stream=True))
+
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def _request_body(parts, prompt: str) -> bytes:
+    prefix, suffix = parts
+    return prefix + _json_dumps(prompt) + suffix
+
+
+def _chat_body(cfg: LLMConfig, messages: List[Dict[str, str]]) -> bytes:
+    """Serialize a full streaming chat request for the configured provider."""
+    if cfg.provider == "ollama":
+        return _json_dumps(_ollama_payload(cfg, messages))
+    return _json_dumps(_openai_payload(cfg, messages, stream=True))
+
+
+def _check_openai_config(cfg: LLMConfig) -> bool:
+    if not cfg.api_key:
+        print("[ERROR] OpenAI API key is not configured. Set it via .env or user_files/api_key.txt.")
+        return False
+    if not cfg.model:
+        print("[ERROR] OpenAI model is not configured. Set it via .env or user_files/model.txt.")
+        return False
+    return True
+
+
+# Core API Call with Retry Logic (from main.py)
+def _request_sentence(word: str, level: str, max_retries: int) -> Optional[str]:
+    cfg = get_config()
+    parts = _ollama_body(cfg) if cfg.provider == "ollama" else _openai_body(cfg)
+    body = _request_body(parts, _render_prompt(word, level))
+    return _request_chat(cfg, body, f"sentence for '{word}'", max_retries)
+
+
+def _request_chat(cfg: LLMConfig, body: bytes, label: str, max_retries: int) -> Optional[str]:
+    """Send one streaming chat request to the configured provider and return its reply."""
+    if cfg.provider == "ollama":
+        if not cfg.ollama_model:
             print("[ERROR] Ollama model is not configured. Set OLLAMA_MODEL or update your .env file.")
             return None
 
-        payload = {
-            "model": OLLAMA_MODEL,
-            "messages": [{"role": "user", "content": prompt}],
-            "options": {"temperature": TEMPERATURE},
-            "stream": False,
-        }
-
         try:
-            print(f"[SLM] Generating sentence for '{word}' using Ollama model '{OLLAMA_MODEL}'...")
-            res = requests.post(OLLAMA_URL, json=payload, timeout=60)
-            res.raise_for_status()
-            data = res.json()
-            # Depending on Ollama version, `message` may be nested differently.
-            content = ""
-            if isinstance(data, dict):
-                if "message" in data and isinstance(data["message"], dict):
-                    content = data["message"].get("content", "")
-                elif "content" in data:
-                    content = data["content"]
-            content = (content or "").strip()
+            print(f"[SLM] Generating {label} using Ollama model '{cfg.ollama_model}'...")
+            with _HTTP.post(cfg.ollama_url, headers=_JSON_HEADERS, stream=True,
+                            data=body, timeout=60) as res:
+                res.raise_for_status()
+                content = _read_stream(res.iter_lines(), _ollama_stream_chunk)
             if not content:
                 print("[ERROR] Empty response from Ollama.")
                 return None
@@ -159,37 +631,30 @@ def generate_sentence_for_word(word: str, max_retries: int = 5) -> Optional[str]
         return None
 
     # Default to OpenAI
-    if not API_KEY:
-        print("[ERROR] OpenAI API key is not configured. Set it via .env or user_files/api_key.txt.")
-        return None
-    if not AI_MODEL:
-        print("[ERROR] OpenAI model is not configured. Set it via .env or user_files/model.txt.")
+    if not _check_openai_config(cfg):
         return None
 
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "model": AI_MODEL,
-        "messages": [{"role": "user", "content": prompt}],
-        "temperature": TEMPERATURE
-    }
+    headers = _openai_headers(cfg)
+    limiter = _rate_limiter(cfg.rpm)
 
     retries = 0
     while retries <= max_retries:
         try:
-            print(f"[API] Generating sentence for '{word}' (attempt {retries + 1})...")
-            res = requests.post(API_URL, headers=headers, json=payload, timeout=30)
-            if res.status_code == 429:
-                wait_time = 30
-                show_info(f"Rate limit reached. Retrying in {wait_time} seconds...")
+            print(f"[API] Generating {label} (attempt {retries + 1})...")
+            if limiter is not None:
+                limiter.acquire()
+            with _HTTP.post(cfg.api_url, headers=headers, data=body, stream=True, timeout=30) as res:
+                status = res.status_code
+                if status in RETRYABLE_STATUS:
+                    wait_time = _retry_delay(retries, res.headers.get("Retry-After"))
+                else:
+                    res.raise_for_status()
+                    content = _read_stream(res.iter_lines(), _openai_stream_chunk)
+            if status in RETRYABLE_STATUS:
+                show_info(f"Server returned {status}. Retrying in {wait_time:.1f} seconds...")
                 non_blocking_wait(wait_time)
                 retries += 1
                 continue
-            res.raise_for_status()
-            data = res.json()
-            content = data["choices"][0]["message"]["content"].strip()
             print(f"[SUCCESS] Generated (OpenAI): {content}")
             return content
         except requests.exceptions.RequestException as e:
@@ -197,7 +662,7 @@ def generate_sentence_for_word(word: str, max_retries: int = 5) -> Optional[str]
             retries += 1
             if retries > max_retries:
                 raise
-            time.sleep(3)
+            time.sleep(_retry_delay(retries))
         except Exception as e:
             show_info(f"Error processing response: {e}")
             raise
@@ -206,78 +671,598 @@ def generate_sentence_for_word(word: str, max_retries: int = 5) -> Optional[str]
     return None
 
 
-def load_csv_data(csv_path: str) -> List[Dict[str, str]]:
-    """Load word data from CSV file"""
-    words = []
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
+def _openai_base_url(cfg: LLMConfig) -> str:
+    """API root (e.g. https://api.openai.com/v1) derived from the chat completions URL."""
+    return cfg.api_url.rstrip("/").rsplit("/chat/completions", 1)[0]
+
+
+def generate_sentences_batch(words: List[str], levels: Optional[List[str]] = None) -> Dict[str, str]:
+    """
+    Generate sentences through the OpenAI Batch API: upload one JSONL request
+    per word, wait for the batch to finish and map the results back.
+    `levels` gives each word's CEFR level; random levels are used without it.
+    Returns word -> sentence; words that failed are missing from the result.
+    """
+    cfg = get_config()
+    if not _check_openai_config(cfg):
+        return {}
+
+    results = {}
+    pending = []
+    levels = levels or [_pick_level() for _ in words]
+    for word, level in dict(zip(words, levels)).items():
+        cached = lookup_cached_sentence(word, level)
+        if cached is not None:
+            results[word] = cached
+        else:
+            pending.append((word, level))
+    if not pending:
+        return results
+
+    # custom_id is the index into `pending`; words themselves may not be valid ids
+    endpoint = urlsplit(cfg.api_url).path
+    lines = [
+        _json_dumps({
+            "custom_id": f"mcq-{i}",
+            "method": "POST",
+            "url": endpoint,
+            "body": _openai_payload(cfg, _user_message(_render_prompt(word, level))),
+        })
+        for i, (word, level) in enumerate(pending)
+    ]
+
+    base_url = _openai_base_url(cfg)
+    auth = {"Authorization": f"Bearer {cfg.api_key}"}
+
+    print(f"[BATCH] Uploading {len(pending)} requests...")
+    res = _HTTP.post(
+        f"{base_url}/files", headers=auth, data={"purpose": "batch"},
+        files={"file": ("mcq_batch.jsonl", b"\n".join(lines), "application/jsonl")},
+        timeout=120,
+    )
+    res.raise_for_status()
+    file_id = _json_loads(res.content)["id"]
+
+    res = _HTTP.post(
+        f"{base_url}/batches", headers=_openai_headers(cfg),
+        json={"input_file_id": file_id, "endpoint": endpoint, "completion_window": "24h"},
+        timeout=30,
+    )
+    res.raise_for_status()
+    batch = _json_loads(res.content)
+    print(f"[BATCH] Created batch {batch['id']} ({batch['status']})")
+
+    while batch["status"] not in BATCH_FINAL_STATUSES:
+        non_blocking_wait(BATCH_POLL_INTERVAL)
+        res = _HTTP.get(f"{base_url}/batches/{batch['id']}", headers=auth, timeout=30)
+        res.raise_for_status()
+        batch = _json_loads(res.content)
+        counts = batch.get("request_counts") or {}
+        print(f"[BATCH] {batch['status']}: {counts.get('completed', 0)}/{counts.get('total', len(pending))} done")
+
+    # Expired batches still carry the output of the requests that finished
+    if not batch.get("output_file_id"):
+        print(f"[ERROR] Batch {batch['id']} ended as '{batch['status']}' without output")
+        return results
+
+    res = _HTTP.get(f"{base_url}/files/{batch['output_file_id']}/content", headers=auth, timeout=120)
+    res.raise_for_status()
+    for line in res.text.splitlines():
+        if not line.strip():
+            continue
+        item = _json_loads(line)
+        word, level = pending[int(item["custom_id"].rsplit("-", 1)[1])]
+        response = item.get("response") or {}
+        if response.get("status_code") != 200:
+            print(f"[ERROR] Batch request for '{word}' failed: {item.get('error') or response.get('body')}")
+            continue
+        content = response["body"]["choices"][0]["message"]["content"].strip()
+        results[word] = content
+        remember_sentence(word, level, content)
+
+    print(f"[BATCH] Generated {len(results)} of {len(words)} sentences")
+    return results
+
+
+async def _request_sentence_async(session, word: str, level: str, max_retries: int) -> Optional[str]:
+    cfg = get_config()
+    parts = _ollama_body(cfg) if cfg.provider == "ollama" else _openai_body(cfg)
+    body = _request_body(parts, _render_prompt(word, level))
+    return await _request_chat_async(session, cfg, body, f"sentence for '{word}'", max_retries)
+
+
+async def _request_chat_async(session, cfg: LLMConfig, body: bytes, label: str,
+                              max_retries: int) -> Optional[str]:
+    if cfg.provider == "ollama":
+        if not cfg.ollama_model:
+            print("[ERROR] Ollama model is not configured. Set OLLAMA_MODEL or update your .env file.")
+            return None
+
+        try:
+            print(f"[SLM] Generating {label} using Ollama model '{cfg.ollama_model}'...")
+            async with session.post(cfg.ollama_url, headers=_JSON_HEADERS,
+                                    data=body,
+                                    timeout=aiohttp.ClientTimeout(total=60)) as res:
+                res.raise_for_status()
+                content = await _read_stream_async(res.content, _ollama_stream_chunk)
+            if not content:
+                print("[ERROR] Empty response from Ollama.")
+                return None
+            print(f"[SUCCESS] Generated (Ollama): {content}")
+            return content
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            show_info(f"HTTP error calling Ollama: {e}")
+        except Exception as e:
+            show_info(f"Error processing Ollama response: {e}")
+        return None
+
+    # Default to OpenAI
+    if not _check_openai_config(cfg):
+        return None
+
+    headers = _openai_headers(cfg)
+    limiter = _rate_limiter(cfg.rpm)
+
+    retries = 0
+    while retries <= max_retries:
+        try:
+            print(f"[API] Generating {label} (attempt {retries + 1})...")
+            if limiter is not None:
+                await limiter.acquire_async()
+            async with session.post(cfg.api_url, headers=headers, data=body,
+                                    timeout=aiohttp.ClientTimeout(total=30)) as res:
+                status = res.status
+                if status in RETRYABLE_STATUS:
+                    wait_time = _retry_delay(retries, res.headers.get("Retry-After"))
+                else:
+                    res.raise_for_status()
+                    content = await _read_stream_async(res.content, _openai_stream_chunk)
+            # Back off outside the response context so the connection is released
+            if status in RETRYABLE_STATUS:
+                show_info(f"Server returned {status}. Retrying in {wait_time:.1f} seconds...")
+                retries += 1
+                await asyncio.sleep(wait_time)
+                continue
+            print(f"[SUCCESS] Generated (OpenAI): {content}")
+            return content
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            show_info(f"HTTP error: {e}")
+            retries += 1
+            if retries > max_retries:
+                raise
+            await asyncio.sleep(_retry_delay(retries))
+        except Exception as e:
+            show_info(f"Error processing response: {e}")
+            raise
+
+    show_info("Maximum retries exceeded. Please try again later.")
+    return None
+
+
+# Words that share a CEFR level are asked for in one request. Every request at
+# a level starts with the same system prompt, which provider prompt caching reuses.
+BUCKET_SYSTEM_PROMPT = (
+    "You write English practice sentences at CEFR level {level}. For each numbered "
+    "word or phrase the user lists, write one normal length sentence using it, "
+    "replacing the word or phrase with a blank (_____). Reply with one line per item, "
+    "formatted as \"<number>. <sentence>\" with the item's number, and nothing else."
+)
+# Same numbered-line format as the batch prompt in main.py
+_NUMBERED_LINE = re.compile(r"^\s*(\d+)[.):]\s*(.+?)\s*$")
+
+
+def _bucket_messages(words: List[str], level: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": BUCKET_SYSTEM_PROMPT.format(level=level)},
+        {"role": "user", "content": "\n".join(f"{i}. {word}" for i, word in enumerate(words, start=1))},
+    ]
+
+
+def _split_bucket_reply(content: str, count: int) -> List[Optional[str]]:
+    """
+    Sentences matched to words by their number in the reply; None for words
+    the reply does not answer. Unnumbered lines continue the previous sentence.
+    """
+    sentences = [None] * count
+    index = None
+    for line in content.splitlines():
+        match = _NUMBERED_LINE.match(line)
+        if match:
+            index = int(match.group(1)) - 1
+            if 0 <= index < count and sentences[index] is None:
+                sentences[index] = match.group(2)
+            else:
+                index = None
+        elif index is not None and line.strip():
+            sentences[index] += " " + line.strip()
+    return sentences
+
+
+def _plan_requests(words: List[str], levels: List[str]):
+    """
+    Split words into cached sentences ({index: sentence}), request groups of
+    same-level word indices (at most MCQ_BATCH_SIZE words per group) and
+    repeats ({first index: [indices of the same word and level]}), which
+    get the first occurrence's sentence instead of a request of their own.
+    """
+    cfg = get_config()
+    # A custom prompt template is used verbatim, one word per request
+    size = cfg.batch_size if cfg.prompt_template == DEFAULT_PROMPT else 1
+    cached = {}
+    buckets = {}
+    first_index = {}
+    repeats = {}
+    for index, (word, level) in enumerate(zip(words, levels)):
+        first = first_index.setdefault((word, level), index)
+        if first != index:
+            repeats.setdefault(first, []).append(index)
+            continue
+        sentence = lookup_cached_sentence(word, level)
+        if sentence is None and size > 1:
+            sentence = lookup_cached_sentence(word, level, BUCKET_SYSTEM_PROMPT)
+        if sentence is not None:
+            cached[index] = sentence
+        else:
+            buckets.setdefault(level, []).append(index)
+    groups = [
+        (level, indices[i:i + size])
+        for level, indices in buckets.items()
+        for i in range(0, len(indices), size)
+    ]
+    return cached, groups, repeats
+
+
+def _remember_group(words: List[str], level: str, sentences: List[Optional[str]],
+                    prompt: Optional[str] = None):
+    for word, sentence in zip(words, sentences):
+        if sentence:
+            remember_sentence(word, level, sentence, prompt)
+
+
+def _unanswered(words: List[str], level: str, sentences: List[Optional[str]]) -> List[int]:
+    """Indices of the words a bucket reply left out, with a warning if there are any."""
+    missing = [i for i, sentence in enumerate(sentences) if sentence is None]
+    if missing:
+        print(f"[WARNING] Reply for {len(words)} words at {level} did not answer "
+              f"{len(missing)} of them; retrying those one by one")
+    return missing
+
+
+def _generate_group(words: List[str], level: str, max_retries: int = 5) -> List[Optional[str]]:
+    """Sentences for words sharing a CEFR level, from a single request when possible."""
+    if len(words) == 1:
+        sentences = [_request_sentence(words[0], level, max_retries)]
+        _remember_group(words, level, sentences)
+        return sentences
+
+    cfg = get_config()
+    content = _request_chat(cfg, _chat_body(cfg, _bucket_messages(words, level)),
+                            f"{len(words)} sentences at {level}", max_retries)
+    if not content:
+        return [None] * len(words)
+    sentences = _split_bucket_reply(content, len(words))
+    _remember_group(words, level, sentences, BUCKET_SYSTEM_PROMPT)
+    missing = _unanswered(words, level, sentences)
+    for i in missing:
+        sentences[i] = _request_sentence(words[i], level, max_retries)
+    _remember_group([words[i] for i in missing], level, [sentences[i] for i in missing])
+    return sentences
+
+
+async def _generate_group_async(session, words: List[str], level: str,
+                                max_retries: int = 5) -> List[Optional[str]]:
+    """Async twin of _generate_group."""
+    if len(words) == 1:
+        sentences = [await _request_sentence_async(session, words[0], level, max_retries)]
+        _remember_group(words, level, sentences)
+        return sentences
+
+    cfg = get_config()
+    content = await _request_chat_async(session, cfg, _chat_body(cfg, _bucket_messages(words, level)),
+                                        f"{len(words)} sentences at {level}", max_retries)
+    if not content:
+        return [None] * len(words)
+    sentences = _split_bucket_reply(content, len(words))
+    _remember_group(words, level, sentences, BUCKET_SYSTEM_PROMPT)
+    missing = _unanswered(words, level, sentences)
+    retried = await asyncio.gather(
+        *(_request_sentence_async(session, words[i], level, max_retries) for i in missing))
+    for i, sentence in zip(missing, retried):
+        sentences[i] = sentence
+    _remember_group([words[i] for i in missing], level, retried)
+    return sentences
+
+
+async def generate_sentences_async(words: List[str], max_concurrency: Optional[int] = None,
+                                   on_sentence: Optional[Callable] = None,
+                                   levels: Optional[List[str]] = None) -> List:
+    """
+    Generate sentences for all words concurrently, one request per group of
+    same-level words, at most `max_concurrency` requests in flight. Returns
+    one entry per word: the sentence, None, or the exception raised for it.
+    `on_sentence(index, entry)` is called as soon as each word finishes.
+    """
+    levels = levels or [_pick_level() for _ in words]
+    results = [None] * len(words)
+    cached, groups, repeats = _plan_requests(words, levels)
+
+    def deliver(index, sentence):
+        for i in (index, *repeats.get(index, ())):
+            results[i] = sentence
+            if on_sentence is not None:
+                on_sentence(i, sentence)
+
+    for index, sentence in cached.items():
+        deliver(index, sentence)
+
+    semaphore = asyncio.Semaphore(max_concurrency or get_config().concurrency)
+
+    async def bounded(session, level, indices):
+        try:
+            async with semaphore:
+                sentences = await _generate_group_async(session, [words[i] for i in indices], level)
+        except Exception as e:
+            sentences = [e] * len(indices)
+        for index, sentence in zip(indices, sentences):
+            deliver(index, sentence)
+
+    # Keep-alive pool shared by every task in the fan-out
+    connector = aiohttp.TCPConnector(limit=32, keepalive_timeout=30)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*(bounded(session, level, indices) for level, indices in groups))
+    return results
+
+
+def generate_sentences_threaded(words: List[str], max_workers: Optional[int] = None,
+                                on_sentence: Optional[Callable] = None,
+                                levels: Optional[List[str]] = None) -> List:
+    """Thread-pool twin of generate_sentences_async, used when aiohttp is missing."""
+    levels = levels or [_pick_level() for _ in words]
+    results = [None] * len(words)
+    cached, groups, repeats = _plan_requests(words, levels)
+
+    def deliver(index, sentence):
+        for i in (index, *repeats.get(index, ())):
+            results[i] = sentence
+            if on_sentence is not None:
+                on_sentence(i, sentence)
+
+    for index, sentence in cached.items():
+        deliver(index, sentence)
+    if not groups:
+        return results
+
+    # Submit every request before collecting any result, so they all run at once
+    workers = min(max_workers or get_config().concurrency, len(groups))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_generate_group, [words[i] for i in indices], level): indices
+            for level, indices in groups
+        }
+        for future in as_completed(futures):
+            indices = futures[future]
+            try:
+                sentences = future.result()
+            except Exception as e:
+                sentences = [e] * len(indices)
+            for index, sentence in zip(indices, sentences):
+                deliver(index, sentence)
+    return results
+
+
+# Columns read from the word CSV; rows come back as WordRow tuples
+CSV_FIELDS = ('Word', 'Back', 'SentenceBlank', 'OptionA', 'OptionB', 'OptionC', 'OptionD', 'Answer')
+WordRow = namedtuple('WordRow', CSV_FIELDS)
+
+# Rows per chunk when streaming the CSV; files larger than CSV_CHUNKED_READ_BYTES
+# are also read in chunks when collecting columns, to keep memory bounded
+CSV_CHUNK_SIZE = 50_000
+CSV_CHUNKED_READ_BYTES = 64 * 1024 * 1024
+
+# De-duplicated distractor words plus each word's position in that list
+DistractorPool = namedtuple('DistractorPool', ('words', 'index'))
+
+
+def _csv_header(csv_path: str) -> List[str]:
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        return next(csv.reader(f), [])
+
+
+def _iter_csv_records(csv_path: str, fields) -> Iterator[List[str]]:
+    """Yield the stripped values of `fields` for every row with a Word"""
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header or 'Word' not in header:
+            return
+        # Resolve column positions once; columns missing from the CSV read as ''
+        columns = [header.index(name) if name in header else None for name in fields]
+        word_col = header.index('Word')
         for row in reader:
-            if row.get('Word', '').strip():
-                words.append({
-                    'Word': row['Word'].strip(),
-                    'Back': row.get('Back', '').strip(),
-                    'SentenceBlank': row.get('SentenceBlank', '').strip(),
-                    'OptionA': row.get('OptionA', '').strip(),
-                    'OptionB': row.get('OptionB', '').strip(),
-                    'OptionC': row.get('OptionC', '').strip(),
-                    'OptionD': row.get('OptionD', '').strip(),
-                    'Answer': row.get('Answer', '').strip(),
-                })
-    return words
-
-
-def generate_mcq_for_words(words: List[Dict[str, str]], test_count: int = 3) -> List[Dict[str, str]]:
+            if word_col < len(row) and row[word_col].strip():
+                yield [row[i].strip() if i is not None and i < len(row) else '' for i in columns]
+
+
+def iter_csv_data(csv_path: str) -> Iterator[WordRow]:
+    """Stream word data from CSV file, one row at a time"""
+    return map(WordRow._make, _iter_csv_records(csv_path, CSV_FIELDS))
+
+
+def load_csv_data(csv_path: str) -> List[WordRow]:
+    """Load word data from CSV file"""
+    return list(iter_csv_data(csv_path))
+
+
+def load_csv_columns(csv_path: str, fields=CSV_FIELDS) -> Dict[str, List[str]]:
+    """Load the given CSV columns as one list per column (e.g. the Word pool)"""
+    try:
+        return _load_csv_columns_pandas(csv_path, fields)
+    except ImportError:
+        pass  # pandas is optional; parse with the csv module instead
+
+    columns = {name: [] for name in fields}
+    appends = [columns[name].append for name in fields]
+    for values in _iter_csv_records(csv_path, fields):
+        for append, value in zip(appends, values):
+            append(value)
+    return columns
+
+
+def iter_csv_chunks(csv_path: str, chunksize: int = CSV_CHUNK_SIZE) -> Iterator[List[WordRow]]:
+    """Stream word data from CSV file as lists of at most `chunksize` rows"""
+    try:
+        import pandas as pd
+    except ImportError:
+        rows = iter_csv_data(csv_path)
+        while True:
+            chunk = list(islice(rows, chunksize))
+            if not chunk:
+                return
+            yield chunk
+
+    usecols = _pandas_usecols(csv_path, CSV_FIELDS)
+    if usecols is None:
+        return
+    for df in pd.read_csv(csv_path, usecols=usecols, dtype=str, keep_default_na=False,
+                          encoding='utf-8', chunksize=chunksize):
+        columns = _frame_columns(df, CSV_FIELDS)
+        chunk = list(map(WordRow._make, zip(*columns.values())))
+        if chunk:
+            yield chunk
+
+
+def _pandas_usecols(csv_path: str, fields) -> Optional[List[str]]:
+    """Columns of `fields` present in the CSV (always including Word); None without Word"""
+    header = _csv_header(csv_path)
+    if 'Word' not in header:
+        return None
+    return [name for name in header if name in fields or name == 'Word']
+
+
+def _frame_columns(df, fields) -> Dict[str, List[str]]:
+    """Strip a text DataFrame, drop rows without a Word and return its columns as lists"""
+    df = df.apply(lambda column: column.str.strip())
+    df = df[df['Word'] != '']
+    return {name: df[name].tolist() if name in df else [''] * len(df) for name in fields}
+
+
+def _load_csv_columns_pandas(csv_path: str, fields) -> Dict[str, List[str]]:
+    """load_csv_columns backed by pandas, using the Arrow parser when pyarrow is installed"""
+    import pandas as pd
+
+    usecols = _pandas_usecols(csv_path, fields)
+    if usecols is None:
+        return {name: [] for name in fields}
+    # Everything stays text: no numeric inference and no "NA"/"null" -> NaN
+    options = dict(usecols=usecols, dtype=str, keep_default_na=False, encoding='utf-8')
+
+    if os.path.getsize(csv_path) >= CSV_CHUNKED_READ_BYTES:
+        # The Arrow engine cannot read in chunks, so large files use the C engine
+        columns = {name: [] for name in fields}
+        for df in pd.read_csv(csv_path, chunksize=CSV_CHUNK_SIZE, **options):
+            for name, values in _frame_columns(df, fields).items():
+                columns[name].extend(values)
+        return columns
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        pass
+    else:
+        try:
+            return _frame_columns(pd.read_csv(csv_path, engine="pyarrow", **options), fields)
+        except pd.errors.ParserError:
+            # The Arrow parser rejects ragged rows (e.g. an extra column) that the
+            # csv module and the C engine read without complaint
+            pass
+    return _frame_columns(pd.read_csv(csv_path, **options), fields)
+
+
+def build_distractor_pool(all_words: Iterable[str]) -> DistractorPool:
+    """De-duplicate the distractor words and index them, once per vocabulary"""
+    words = list(dict.fromkeys(all_words))
+    return DistractorPool(words, {w: i for i, w in enumerate(words)})
+
+
+def _pick_distractors(pool: List[str], target: int, count: int = 3) -> List[str]:
+    """
+    Pick `count` distinct pool entries other than pool[target] by drawing
+    random indices and rejecting repeats, O(1) on average for large pools.
+    """
+    picks = set()
+    while len(picks) < count:
+        j = random.randrange(len(pool))
+        if j != target:
+            picks.add(j)
+    return [pool[j] for j in picks]
+
+
+def generate_mcq_for_words(words: Iterable[WordRow], test_count: int = 3,
+                           use_batch: bool = False,
+                           all_words: Optional[List[str]] = None,
+                           pool: Optional[DistractorPool] = None,
+                           on_result: Optional[Callable[[Dict[str, str]], None]] = None) -> List[Dict[str, str]]:
     """
     Generate MCQs for given words using local distractors.
     Similar to generate_mcq_for_cards in main.py but works with CSV data.
+    `words` may be a stream; only its first `test_count` rows are consumed.
+    Pass `all_words` (the full distractor pool) when `words` is a stream,
+    otherwise it is collected from `words`. Callers processing the CSV in
+    chunks pass a prebuilt `pool` instead, so it is not rebuilt per chunk.
+    With use_batch, runs of MCQ_BATCH_THRESHOLD or more words go through the
+    OpenAI Batch API instead of one chat completion per word.
+    `on_result` receives each MCQ as soon as its sentence arrives.
     """
-    if not words:
+    if pool is None:
+        if all_words is None:
+            words = list(words)
+            all_words = [w.Word for w in words]
+        pool = build_distractor_pool(all_words)
+    pool, word_to_idx = pool
+    
+    if not pool:
         print("[ERROR] No words provided")
         return []
     
-    if len(words) < 4:
+    if len(pool) < 4:
         print("[ERROR] Need at least 4 words for MCQ generation.")
         return []
     
-    # Get all words for distractors
-    all_words = [w['Word'] for w in words if w['Word']]
-    
     # Test with first N words
-    test_words = words[:test_count]
-    results = []
+    test_words = list(islice(words, test_count))
     
     print(f"\n{'='*60}")
     print(f"Generating MCQs for {len(test_words)} words")
     print(f"{'='*60}\n")
     
+    # Pick distractors up front so every sentence request can be sent at once
+    jobs = []
     for index, word_data in enumerate(test_words, 1):
-        word = word_data['Word']
-        if not word:
-            continue
+        word = word_data.Word
         
         print(f"\n[{index}/{len(test_words)}] Processing: {word}")
         
         # Get distractors from other words
-        others = [w for w in all_words if w != word]
-        if len(others) < 3:
+        target = word_to_idx.get(word, -1)
+        if len(pool) - (target >= 0) < 3:
             print(f"[WARNING] Not enough distractors for {word}, skipping")
             continue
         
-        distractors = random.sample(others, 3)
-        
-        # Generate sentence
-        try:
-            sentence = generate_sentence_for_word(word)
-            if sentence is None:
-                print(f"[SKIP] Failed to generate sentence for {word}")
-                continue
-        except Exception as e:
-            print(f"[ERROR] Exception generating sentence for {word}: {e}")
-            continue
+        jobs.append((word, _pick_distractors(pool, target)))
+    
+    results = [None] * len(jobs)
+    
+    def finish(index, sentence):
+        word, distractors = jobs[index]
+        if isinstance(sentence, Exception):
+            print(f"[ERROR] Exception generating sentence for {word}: {sentence}")
+            return
+        if sentence is None:
+            print(f"[SKIP] Failed to generate sentence for {word}")
+            return
         
-        # Create options
-        options = [word] + distractors
-        random.shuffle(options)
+        # Create options: one random permutation of the answer and distractors
+        options = random.sample((word, *distractors), 4)
         
         result = {
             'Word': word,
@@ -289,26 +1274,47 @@ def generate_mcq_for_words(words: List[Dict[str, str]], test_count: int = 3) ->
             'Answer': word,
         }
         
-        results.append(result)
+        results[index] = result
+        if on_result is not None:
+            on_result(result)
         
         # Display result
+        print(f"\n{word}")
         print(f"  Sentence: {sentence}")
         print(f"  Options: A) {options[0]}, B) {options[1]}, C) {options[2]}, D) {options[3]}")
         print(f"  Answer: {word}")
     
-    return results
+    # Generate sentences; levels are picked up front so words can be grouped by level
+    cfg = get_config()
+    job_words = [word for word, _ in jobs]
+    levels = [_pick_level() for _ in jobs]
+    try:
+        if use_batch and cfg.provider != "ollama" and len(jobs) >= cfg.batch_threshold:
+            batch_results = generate_sentences_batch(job_words, levels)
+            for index, word in enumerate(job_words):
+                finish(index, batch_results.get(word))
+        elif aiohttp is not None:
+            asyncio.run(generate_sentences_async(job_words, on_sentence=finish, levels=levels))
+        else:
+            generate_sentences_threaded(job_words, on_sentence=finish, levels=levels)
+    finally:
+        save_semantic_cache()
+    
+    # Keep input order regardless of completion order
+    return [result for result in results if result is not None]
+
+
+RESULT_FIELDS = ['Word', 'SentenceBlank', 'OptionA', 'OptionB', 'OptionC', 'OptionD', 'Answer']
 
 
 def save_results_to_csv(results: List[Dict[str, str]], output_path: str):
-    """Save generated results to CSV file"""
+    """Save generated results to CSV file (for callers that collect results first)"""
     if not results:
         print("[WARNING] No results to save")
         return
     
-    fieldnames = ['Word', 'SentenceBlank', 'OptionA', 'OptionB', 'OptionC', 'OptionD', 'Answer']
-    
     with open(output_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
         writer.writeheader()
         writer.writerows(results)
     
@@ -325,6 +1331,7 @@ def main():
     csv_path = os.path.join(os.path.dirname(__file__), 'word_cards.csv')
     output_path = os.path.join(os.path.dirname(__file__), 'test_results.csv')
     test_count = 1 # Number of words to test
+    use_batch = '--batch' in sys.argv[1:]
     
     # Check if CSV exists
     if not os.path.exists(csv_path):
@@ -334,36 +1341,67 @@ def main():
     # Check configuration
     print(f"\nConfiguration:")
     print(f"  CSV file: {csv_path}")
-    print(f"  API URL: {API_URL or 'https://api.openai.com/v1/chat/completions'}")
-    print(f"  Model: {AI_MODEL}")
-    print(f"  Temperature: {TEMPERATURE}")
-    print(f"  API Key: {'***' + API_KEY[-4:] if API_KEY else 'NOT SET'}")
+    cfg = get_config()
+    print(f"  API URL: {cfg.api_url or 'https://api.openai.com/v1/chat/completions'}")
+    print(f"  Model: {cfg.model}")
+    print(f"  Temperature: {cfg.temperature}")
+    print(f"  API Key: {'***' + cfg.api_key[-4:] if cfg.api_key else 'NOT SET'}")
+    print(f"  Batch API: {f'on (>= {cfg.batch_threshold} words)' if use_batch else 'off'}")
     
-    if not API_KEY:
+    if not cfg.api_key:
         print("\n[ERROR] API_KEY not configured!")
         print("Please set it in config.json or .env file")
         return
     
-    # Load words from CSV
+    # Pass 1: read only the Word column for the distractor pool
     print(f"\nLoading words from {csv_path}...")
-    words = load_csv_data(csv_path)
-    print(f"[SUCCESS] Loaded {len(words)} words from CSV")
+    all_words = load_csv_columns(csv_path, ('Word',))['Word']
+    print(f"[SUCCESS] Loaded {len(all_words)} words from CSV")
     
-    if not words:
+    if not all_words:
         print("[ERROR] No words found in CSV file")
         return
+    pool = build_distractor_pool(all_words)
+    del all_words
     
-    # Generate MCQs
-    results = generate_mcq_for_words(words, test_count=test_count)
+    # Pass 2: stream the rows in bounded chunks and generate MCQs per chunk.
+    # Each MCQ is written as soon as it exists, so a crash keeps what was paid for.
+    # The file is opened on the first MCQ, so a run that generates nothing
+    # leaves the previous results in place.
+    saved = 0
+    out = writer = None
     
-    if results:
-        # Save results
-        save_results_to_csv(results, output_path)
-        
+    def write_result(result):
+        nonlocal saved, out, writer
+        if out is None:
+            out = open(output_path, 'w', newline='', encoding='utf-8')
+            writer = csv.DictWriter(out, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+        writer.writerow(result)
+        out.flush()
+        saved += 1
+    
+    try:
+        remaining = test_count
+        for chunk in iter_csv_chunks(csv_path, min(test_count, CSV_CHUNK_SIZE)):
+            generate_mcq_for_words(
+                chunk, test_count=remaining, use_batch=use_batch, pool=pool,
+                on_result=write_result,
+            )
+            remaining -= len(chunk)
+            if remaining <= 0:
+                break
+            del chunk
+            gc.collect()
+    finally:
+        if out is not None:
+            out.close()
+    
+    if saved:
         print(f"\n{'='*60}")
         print("Test Summary")
         print(f"{'='*60}")
-        print(f"Total words processed: {len(results)}")
+        print(f"Total words processed: {saved}")
         print(f"Results saved to: {output_path}")
     else:
         print("\n[WARNING] No MCQs were generated")